@@ -21,6 +21,15 @@ class GMTBlenderBoneProps:
         self.parent_name = ''
 
 
+# Props for bones that are missing from the armature. Shared, so it should never be modified
+DEFAULT_BONE_PROPS = GMTBlenderBoneProps()
+
+
+def get_bone_and_parent_props(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str) -> Tuple[GMTBlenderBoneProps, GMTBlenderBoneProps]:
+    prop = bone_props.get(bone_name, DEFAULT_BONE_PROPS)
+    return prop, bone_props.get(prop.parent_name, DEFAULT_BONE_PROPS)
+
+
 def get_edit_bones_props(ao: bpy.types.Object) -> Dict[str, GMTBlenderBoneProps]:
     bpy.ops.object.mode_set(mode='EDIT')
 
@@ -1,32 +1,86 @@
-from math import atan, tan
+from math import atan
 from typing import Dict, List, Tuple
 
+import numpy as np
 from bpy.types import Camera
 from mathutils import Matrix, Quaternion, Vector
 
 from ..gmt_lib import *
 from ..gmt_lib.gmt.structure.cmt import CMTAnimation
-from .bone_props import GMTBlenderBoneProps
+from .bone_props import GMTBlenderBoneProps, get_bone_and_parent_props
 
 
 def pos_to_blender(pos):
     return Vector([-pos[0], pos[2], pos[1]])
 
 
+def pos_to_blender_np(pos: np.ndarray) -> np.ndarray:
+    return pos[:, [0, 2, 1]] * np.array([-1.0, 1.0, 1.0])
+
+
 def pos_from_blender(pos: Vector) -> Tuple[float]:
     return (-pos[0], pos[2], pos[1])
 
 
+def pos_from_blender_np(pos: np.ndarray) -> np.ndarray:
+    return pos[:, [0, 2, 1]] * np.array([-1.0, 1.0, 1.0])
+
+
 def rot_to_blender(rot):
     return Quaternion([rot[3], -rot[0], rot[2], rot[1]])
 
 
+def rot_to_blender_np(rot: np.ndarray) -> np.ndarray:
+    return rot[:, [3, 0, 2, 1]] * np.array([1.0, -1.0, 1.0, 1.0])
+
+
 def rot_from_blender(rot: Quaternion) -> Tuple[float]:
     return (-rot[1], rot[3], rot[2], rot[0])
 
 
+def rot_from_blender_np(rot: np.ndarray) -> np.ndarray:
+    return rot[:, [1, 3, 2, 0]] * np.array([-1.0, 1.0, 1.0, 1.0])
+
+
+def quat_mul_np(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Hamilton product of (w, x, y, z) quaternions, same as Quaternion @ Quaternion
+    # Either argument can be a single quaternion or an (N, 4) array of quaternions
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+
+    return np.stack((
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ), axis=-1)
+
+
+def slerp_np(q0: np.ndarray, q1: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # Same as Quaternion.slerp for each pair of rows in the (N, 4) arrays q0 and q1, with t as an (N,) array
+    # Everything is computed on (N,) weights, so only the result needs a new (N, 4) array
+    dot = np.einsum('ij,ij->i', q0, q1)
+
+    # Rotate around the shortest angle. Blender negates the first quaternion for this
+    sign = np.where(dot < 0.0, -1.0, 1.0)
+    dot = np.abs(dot)
+
+    # Fall back to lerp for (almost) aligned quaternions, like Blender does
+    linear = dot >= 1.0 - 1e-4
+    theta = np.arccos(np.where(linear, 0.0, dot))
+    sin_theta = np.where(linear, 1.0, np.sin(theta))
+
+    w0 = np.where(linear, 1.0 - t, np.sin((1.0 - t) * theta) / sin_theta) * sign
+    w1 = np.where(linear, t, np.sin(t * theta) / sin_theta)
+
+    result = q0 * w0[:, None]
+    result += q1 * w1[:, None]
+
+    return result
+
+
 def pattern1_to_blender(pattern: List[List[int]]) -> List[int]:
-    return list(map(lambda x: (x[0],), pattern))
+    return [(x[0],) for x in pattern]
 
 
 def pattern1_from_blender(pattern: List[int]) -> List[List[int]]:
@@ -44,7 +98,8 @@ def pattern2_from_blender(pattern: List[int]) -> List[List[int]]:
 
 def fov_to_blender(fov, sensor_height):
     # sensor_height should be 100.0 here
-    return (sensor_height / 2) / tan(fov / 2)
+    # fov can also be an array of all fovs in an animation
+    return (sensor_height / 2) / np.tan(fov / 2)
 
 
 def fov_from_blender(fov, sensor_height):
@@ -53,29 +108,52 @@ def fov_from_blender(fov, sensor_height):
 
 
 def focus_point_to_blender(focus_point, location):
-    return location + ((focus_point - location).to_track_quat('Z', 'Y') @ Vector((0.0, 0.0, -(focus_point - location).length)))
+    # Equivalent to location + ((focus_point - location).to_track_quat('Z', 'Y') @ Vector((0.0, 0.0, -length)))
+    # The track quaternion rotates Z onto the direction of the focus point, so the rotated vector is always
+    # -(focus_point - location), i.e. the focus point mirrored around the location
+    return location * 2 - focus_point
 
 
 def focus_point_from_blender(focus_point, location):
-    return location + ((focus_point - location).to_track_quat('-Z', 'Y') @ Vector((0.0, 0.0, (focus_point - location).length)))
+    # Equivalent to location + ((focus_point - location).to_track_quat('-Z', 'Y') @ Vector((0.0, 0.0, length)))
+    # Which is also the focus point mirrored around the location (see focus_point_to_blender)
+    return location * 2 - focus_point
 
 
 def convert_gmt_curve_to_blender(curve: GMTCurve):
     curve.fill_channels()
 
     if curve.type == GMTCurveType.LOCATION:
-        for kf in curve.keyframes:
-            kf.value = pos_to_blender(kf.value)
+        to_blender = pos_to_blender_np
     elif curve.type == GMTCurveType.ROTATION:
-        for kf in curve.keyframes:
-            kf.value = rot_to_blender(kf.value)
+        to_blender = rot_to_blender_np
+    else:
+        return
+
+    if not curve.keyframes:
+        return
+
+    # Convert all keyframes at once instead of creating intermediate objects for each one
+    values = to_blender(np.array([kf.value[:] for kf in curve.keyframes], dtype=np.float64))
+
+    for kf, value in zip(curve.keyframes, values.tolist()):
+        kf.value = tuple(value)
 
 
 def convert_cmt_anm_to_blender(anm: CMTAnimation, camera_data: Camera):
-    for frame in anm.frames:
-        frame.location = pos_to_blender(frame.location)
-        frame.focus_point = focus_point_to_blender(pos_to_blender(frame.focus_point), frame.location)
-        frame.fov = fov_to_blender(frame.fov, camera_data.sensor_height)
+    if not anm.frames:
+        return
+
+    # Convert all frames at once, then only create the final objects for each frame
+    locations = pos_to_blender_np(np.array([frame.location[:] for frame in anm.frames], dtype=np.float64))
+    focus_points = focus_point_to_blender(
+        pos_to_blender_np(np.array([frame.focus_point[:] for frame in anm.frames], dtype=np.float64)), locations)
+    fovs = fov_to_blender(np.array([frame.fov for frame in anm.frames], dtype=np.float64), camera_data.sensor_height)
+
+    for frame, location, focus_point, fov in zip(anm.frames, locations.tolist(), focus_points.tolist(), fovs.tolist()):
+        frame.location = Vector(location)
+        frame.focus_point = Vector(focus_point)
+        frame.fov = fov
 
 
 def convert_cmt_anm_from_blender(anm: CMTAnimation, camera_data: Camera):
@@ -85,42 +163,39 @@ def convert_cmt_anm_from_blender(anm: CMTAnimation, camera_data: Camera):
         frame.fov = fov_from_blender(frame.fov, camera_data.sensor_height)
 
 
-def transform_location_to_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: List[Vector]):
-    prop = bone_props.get(bone_name, GMTBlenderBoneProps())
-    head = prop.head
+def transform_points_np(mat: np.ndarray, offset: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # (pre_mat @ Matrix.Translation(p) @ post_mat).to_translation() is the same as
+    # pre_mat.to_3x3() @ p + (pre_mat @ post_mat).to_translation(), so only the 3x3 matrix and offset are needed
+    return points @ mat.T + offset
 
-    parent_head = bone_props.get(prop.parent_name)
-    if parent_head:
-        parent_head = parent_head.head
-    else:
-        parent_head = Vector()
 
-    loc = prop.loc
-    rot = prop.rot
+def transform_location_to_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: np.ndarray) -> np.ndarray:
+    prop, parent_prop = get_bone_and_parent_props(bone_props, bone_name)
+    head = prop.head
+    parent_head = parent_prop.head
+
+    loc_mat = Matrix.Translation(prop.loc)
+    rot_mat = prop.rot.to_matrix().to_4x4()
 
     pre_mat = (
-        Matrix.Translation(loc).inverted()
-        @ rot.to_matrix().to_4x4().inverted()
+        loc_mat.inverted()
+        @ rot_mat.inverted()
     )
 
     post_mat = (
-        rot.to_matrix().to_4x4()
-        @ Matrix.Translation(loc)
+        rot_mat
+        @ loc_mat
     )
 
-    values = list(map(lambda x: (pre_mat @ Matrix.Translation(x - head + parent_head) @ post_mat).to_translation(), values))
+    mat = pre_mat.to_3x3()
+    offset = mat @ (parent_head - head) + (pre_mat @ post_mat).to_translation()
 
-    return values
+    return transform_points_np(np.array(mat), np.array(offset), np.asarray(values, dtype=np.float64).reshape(-1, 3))
 
 
-def transform_rotation_to_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: List[Quaternion]):
-    prop = bone_props.get(bone_name, GMTBlenderBoneProps())
-
-    parent_rot = bone_props.get(prop.parent_name)
-    if parent_rot:
-        parent_rot = parent_rot.rot_local
-    else:
-        parent_rot = Quaternion()
+def transform_rotation_to_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: np.ndarray) -> np.ndarray:
+    prop, parent_prop = get_bone_and_parent_props(bone_props, bone_name)
+    parent_rot = parent_prop.rot_local
 
     rot = prop.rot
     rot_local = prop.rot_local
@@ -128,49 +203,39 @@ def transform_rotation_to_blender(bone_props: Dict[str, GMTBlenderBoneProps], bo
     pre_quat = rot.inverted() @ parent_rot
     post_quat = rot_local.inverted() @ parent_rot.inverted() @ rot
 
-    return list(map(lambda x: pre_quat @ x @ post_quat, values))
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    return quat_mul_np(quat_mul_np(np.array(pre_quat), values), np.array(post_quat))
 
 
-def transform_location_from_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: List[Vector]) -> List[Tuple[float]]:
-    prop = bone_props.get(bone_name, GMTBlenderBoneProps())
+def transform_location_from_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: np.ndarray) -> List[Tuple[float]]:
+    prop, parent_prop = get_bone_and_parent_props(bone_props, bone_name)
     head = prop.head
+    parent_head = parent_prop.head
 
-    parent_head = bone_props.get(prop.parent_name)
-    if parent_head:
-        parent_head = parent_head.head
-    else:
-        parent_head = Vector()
-
-    loc = prop.loc
-    rot = prop.rot
+    loc_mat = Matrix.Translation(prop.loc)
+    rot_mat = prop.rot.to_matrix().to_4x4()
 
     pre_mat = (
-        rot.to_matrix().to_4x4()
-        @ Matrix.Translation(loc)
+        rot_mat
+        @ loc_mat
     )
 
     post_mat = (
-        Matrix.Translation(loc).inverted()
-        @ rot.to_matrix().to_4x4().inverted()
+        loc_mat.inverted()
+        @ rot_mat.inverted()
     )
 
-    values = list(map(lambda x: pos_from_blender((
-        pre_mat
-        @ Matrix.Translation(x)
-        @ post_mat
-    ).to_translation() + head - parent_head), values))
+    mat = pre_mat.to_3x3()
+    offset = (pre_mat @ post_mat).to_translation() + head - parent_head
 
-    return values
+    values = transform_points_np(np.array(mat), np.array(offset), np.asarray(values, dtype=np.float64).reshape(-1, 3))
 
+    return list(map(tuple, pos_from_blender_np(values).tolist()))
 
-def transform_rotation_from_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: List[Quaternion]) -> List[Tuple[float]]:
-    prop = bone_props.get(bone_name, GMTBlenderBoneProps())
 
-    parent_rot = bone_props.get(prop.parent_name)
-    if parent_rot:
-        parent_rot = parent_rot.rot_local
-    else:
-        parent_rot = Quaternion()
+def transform_rotation_from_blender(bone_props: Dict[str, GMTBlenderBoneProps], bone_name: str, values: np.ndarray) -> List[Tuple[float]]:
+    prop, parent_prop = get_bone_and_parent_props(bone_props, bone_name)
+    parent_rot = parent_prop.rot_local
 
     rot = prop.rot
     rot_local = prop.rot_local
@@ -178,4 +243,7 @@ def transform_rotation_from_blender(bone_props: Dict[str, GMTBlenderBoneProps],
     pre_quat = parent_rot.inverted() @ rot
     post_quat = rot.inverted() @ parent_rot @ rot_local
 
-    return list(map(lambda x: rot_from_blender(pre_quat @ x @ post_quat), values))
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    values = quat_mul_np(quat_mul_np(np.array(pre_quat), values), np.array(post_quat))
+
+    return list(map(tuple, rot_from_blender_np(values).tolist()))
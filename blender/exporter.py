@@ -1,7 +1,8 @@
-from copy import deepcopy
-from typing import Dict, List
+from copy import copy
+from typing import Dict, List, Tuple
 
 import bpy
+import numpy as np
 from bpy.props import BoolProperty, EnumProperty, StringProperty
 from bpy.types import Action, FCurve, Operator
 from bpy_extras.io_utils import ExportHelper
@@ -19,6 +20,22 @@ from .coordinate_converter import (convert_cmt_anm_from_blender,
                                    transform_rotation_from_blender)
 from .error import GMTError
 
+# Last items returned by each EnumProperty items callback, along with the names they were made from
+# Blender requires Python to keep references to the returned strings, and callbacks run on every redraw,
+# so the same items are returned as long as the names did not change
+enum_items_cache: Dict[str, Tuple[List[str], List[Tuple[str, str, str]]]] = dict()
+
+
+def cached_enum_items(prop_name: str, names: List[str]) -> List[Tuple[str, str, str]]:
+    cached = enum_items_cache.get(prop_name)
+    if cached and cached[0] == names:
+        return cached[1]
+
+    items = [(name, name, "") for name in names]
+    enum_items_cache[prop_name] = (names, items)
+
+    return items
+
 
 class ExportGMT(Operator, ExportHelper):
     """Exports an animation to the GMT format"""
@@ -43,8 +60,6 @@ class ExportGMT(Operator, ExportHelper):
                 break
 
     def action_callback(self, context: bpy.context):
-        items = []
-
         # TODO: Instead of setting the default action to the one used by the active object,
         # maybe we should use the one used by the selected armature_name?
         action_name = ""
@@ -54,15 +69,15 @@ class ExportGMT(Operator, ExportHelper):
             selected_action = ao.animation_data.action
             if selected_action:
                 action_name = selected_action.name
-                items.append((action_name, action_name, ""))
 
-        for a in [act for act in bpy.data.actions if act.name != action_name]:
-            items.append((a.name, a.name, ""))
-        return items
+        names = bpy.data.actions.keys()
+        if action_name in names:
+            names.remove(action_name)
+            names.insert(0, action_name)
 
-    def armature_callback(self, context: bpy.context):
-        items = []
+        return cached_enum_items('action_name', names)
 
+    def armature_callback(self, context: bpy.context):
         if self.export_format == 'CMT':
             ao = context.scene.camera
             obj_type = 'CAMERA'
@@ -72,13 +87,12 @@ class ExportGMT(Operator, ExportHelper):
 
         ao_name = ao.name if ao else ''
 
+        names = [obj.name for obj in bpy.data.objects if obj.type == obj_type and obj.name != ao_name]
         if ao and ao.type == obj_type:
             # Add the selected armature first so that it's the default value
-            items.append((ao_name, ao_name, ""))
+            names.insert(0, ao_name)
 
-        for a in [arm for arm in bpy.data.objects if arm.type == obj_type and arm.name != ao_name]:
-            items.append((a.name, a.name, ""))
-        return items
+        return cached_enum_items('armature_name', names)
 
     def action_update(self, context: bpy.context):
         name = self.action_name
@@ -249,7 +263,7 @@ class ExportGMT(Operator, ExportHelper):
 
         # check the active object first
         ao = context.active_object
-        if ao and ao.type == 'ARMATURE' and ao.data.bones[:]:
+        if ao and ao.type == 'ARMATURE' and len(ao.data.bones):
             return 0
 
         # if the active object isn't a valid armature, get its collection and check
@@ -260,15 +274,17 @@ class ExportGMT(Operator, ExportHelper):
             collection = context.view_layer.active_layer_collection
 
         if collection and collection.name != 'Master Collection':
-            meshObjects = [o for o in bpy.data.collections[collection.name].objects
-                           if o.data in bpy.data.meshes[:] and o.find_armature()]
-
-            armatures = [a.find_armature() for a in meshObjects]
-            if meshObjects:
-                armature = armatures[0]
-                if armature.data.bones[:]:
-                    context.view_layer.objects.active = armature
-                    return 0
+            # Use the armature of the first mesh that has one
+            for o in bpy.data.collections[collection.name].objects:
+                if o.type != 'MESH':
+                    continue
+
+                armature = o.find_armature()
+                if armature:
+                    if len(armature.data.bones):
+                        context.view_layer.objects.active = armature
+                        return 0
+                    break
 
         return "No armature found to get animation from"
 
@@ -342,14 +358,18 @@ class GMTExporter:
         loc_axes = ('x', 'y', 'z')
         rot_axes = ('w',) + loc_axes
         for c in channels:
+            # Each access to an FCurve property creates a new Python object, so only get them once
+            full_data_path = c.data_path
+            array_index = c.array_index
+
             # Data path without bone name
-            data_path = c.data_path[c.data_path.rindex('.') + 1:] if '.' in c.data_path else ''
+            data_path = full_data_path[full_data_path.rindex('.') + 1:] if '.' in full_data_path else ''
 
-            if data_path == 'location' and (0 <= c.array_index < 3):
-                loc_curves[loc_axes[c.array_index]] = c
+            if data_path == 'location' and (0 <= array_index < 3):
+                loc_curves[loc_axes[array_index]] = c
 
-            elif data_path == 'rotation_quaternion' and (0 <= c.array_index < 4):
-                rot_curves[rot_axes[c.array_index]] = c
+            elif data_path == 'rotation_quaternion' and (0 <= array_index < 4):
+                rot_curves[rot_axes[array_index]] = c
 
             elif data_path.startswith('pat1'):
                 pat1_curves[data_path] = c
@@ -358,7 +378,7 @@ class GMTExporter:
                 pat_other_curves[data_path] = c
 
             else:
-                print(f'Warning: Ignoring curve with unsupported data path {c.data_path} and index {c.array_index}')
+                print(f'Warning: Ignoring curve with unsupported data path {full_data_path} and index {array_index}')
 
         # Location curves
         if 0 < len(loc_curves) <= 3:
@@ -415,23 +435,24 @@ class GMTExporter:
         #   one pattern channel
 
         channel_count = len(fcurves)
-        channel_indices = list(map(lambda c: c.array_index, fcurves))
+        channel_indices = [c.array_index for c in fcurves]
 
         # axes_co = []
-        keyframes_dict = dict()
+        axes_frames = []
         for i in range(channel_count):
-            axis_co = [0] * 2 * len(fcurves[i].keyframe_points)
+            axis_co = np.empty(2 * len(fcurves[i].keyframe_points), dtype=np.float32)
             fcurves[i].keyframe_points.foreach_get('co', axis_co)
 
-            keyframes_dict.update(dict.fromkeys(axis_co[::2]))
+            axes_frames.append(axis_co[::2])
             # axis_co_iter = iter(axis_co)
             # axes_co.append(zip(axis_co_iter, axis_co_iter))
 
-        keyframes: List[float] = sorted(keyframes_dict)
+        # Sorted frames of all channels combined, without duplicates
+        keyframes: List[float] = np.unique(np.concatenate(axes_frames)).tolist()
 
         channel_values = []
         for i in range(channel_count):
-            channel_values.append(list(map(lambda k: fcurves[i].evaluate(k), keyframes)))
+            channel_values.append([fcurves[i].evaluate(k) for k in keyframes])
 
         # Alternative code for fixing unmatching keyframes
         # Was made in case using fcurve.evaluate is slow, but it turns out it isn't
@@ -460,22 +481,18 @@ class GMTExporter:
                 for i in [x for x in range(3) if x not in channel_indices]:
                     channel_values.insert(i, [bone.location[i]] * len(keyframes))
 
-            converted_values = transform_location_from_blender(self.bone_props, bone_name, list(map(
-                lambda x, y, z: Vector((x, y, z)),
-                channel_values[0],
-                channel_values[1],
-                channel_values[2]
-            )))
+            converted_values = transform_location_from_blender(
+                self.bone_props, bone_name, np.column_stack(channel_values))
 
             # Check if there are any completely zero channels
-            empties = list(map(lambda i: all(map(lambda x: x[i] == 0.0, converted_values)), range(3)))
+            empties = [all(x[i] == 0.0 for x in converted_values) for i in range(3)]
 
             # If at least two channels are empty, change the channel type and update the values
             if empties.count(True) >= 2:
                 # If no channels are non-empty, choose X
                 i = empties.index(False) if False in empties else 0
 
-                converted_values = list(map(lambda v: (v[i],), converted_values))
+                converted_values = [(v[i],) for v in converted_values]
                 channel = (GMTCurveChannel.X, GMTCurveChannel.Y, GMTCurveChannel.Z)[i]
 
         elif curve_type == GMTCurveType.ROTATION:
@@ -486,16 +503,11 @@ class GMTExporter:
                 for i in [x for x in range(4) if x not in channel_indices]:
                     channel_values.insert(i, [bone.rotation_quaternion[i]] * len(keyframes))
 
-            converted_values = transform_rotation_from_blender(self.bone_props, bone_name, list(map(
-                lambda w, x, y, z: Quaternion((w, x, y, z)),
-                channel_values[0],
-                channel_values[1],
-                channel_values[2],
-                channel_values[3],
-            )))
+            converted_values = transform_rotation_from_blender(
+                self.bone_props, bone_name, np.column_stack(channel_values))
 
             # Check if there are any completely zero channels (from x, y, z only)
-            empties = list(map(lambda i: all(map(lambda x: x[i] == 0.0, converted_values)), range(3)))
+            empties = [all(x[i] == 0.0 for x in converted_values) for i in range(3)]
 
             # If at least two channels are empty, change the channel type and update the values
             if empties.count(True) >= 2:
@@ -503,7 +515,7 @@ class GMTExporter:
                 i = empties.index(False) if False in empties else 0
 
                 # v[3] is w channel
-                converted_values = list(map(lambda v: (v[i], v[3]), converted_values))
+                converted_values = [(v[i], v[3]) for v in converted_values]
                 channel = (GMTCurveChannel.XW, GMTCurveChannel.YW, GMTCurveChannel.ZW)[i]
 
         elif curve_type == GMTCurveType.PATTERN_HAND:
@@ -513,18 +525,19 @@ class GMTExporter:
                 # Prevent pattern numbers larger than old engine max to be exported
                 converted_values = self.correct_pattern(converted_values)
 
-            converted_values = list(map(lambda s, e: [int(s), int(e)], *pattern1_from_blender(converted_values)))
+            converted_values = [[int(s), int(e)] for s, e in zip(*pattern1_from_blender(converted_values))]
         elif curve_type in (GMTCurveType.PATTERN_UNK, GMTCurveType.PATTERN_FACE):
-            converted_values = list(map(lambda v: [int(v)], pattern2_from_blender(channel_values[0])))
+            converted_values = [[int(v)] for v in pattern2_from_blender(channel_values[0])]
 
         # Create the GMTCurve after finalizing all changes to the FCurves
         curve = GMTCurve(curve_type, channel)
-        curve.keyframes = list(map(lambda f, v: GMTKeyframe(int(f), v), keyframes, converted_values))
+        curve.keyframes = [GMTKeyframe(int(f), v) for f, v in zip(keyframes, converted_values)]
 
         return curve
 
     def correct_pattern(self, pattern):
-        return list(map(lambda x: 0 if x > 17 else x, pattern))
+        pattern = np.asarray(pattern)
+        return np.where(pattern > 17, 0, pattern).tolist()
 
 
 class CMTExporter:
@@ -610,24 +623,24 @@ class CMTExporter:
         fcurves = [x for x in fcurves if x]
 
         channel_count = len(fcurves)
-        channel_indices = list(map(lambda c: c.array_index, fcurves))
+        channel_indices = [c.array_index for c in fcurves]
 
         channel_values = []
         for i in range(channel_count):
-            channel_values.append(list(map(lambda k: fcurves[i].evaluate(k), range(frame_count))))
+            channel_values.append([fcurves[i].evaluate(k) for k in range(frame_count)])
 
         if datapath == 'location':
             if channel_count != 3:
                 for i in [x for x in range(3) if x not in channel_indices]:
                     channel_values.insert(i, [self.camera.location[i]] * frame_count)
 
-            return list(map(lambda x, y, z: Vector((x, y, z)), *channel_values))
+            return [Vector(v) for v in zip(*channel_values)]
         elif datapath == 'rotation_quaternion':
             if channel_count != 4:
                 for i in [x for x in range(4) if x not in channel_indices]:
                     channel_values.insert(i, [self.camera.rotation_quaternion[i]] * frame_count)
 
-            return list(map(lambda w, x, y, z: Quaternion((w, x, y, z)), *channel_values))
+            return [Quaternion(v) for v in zip(*channel_values)]
         else:
             # Single channels only
             if not channel_values:
@@ -658,7 +671,7 @@ class IFAExporter(GMTExporter):
             raise GMTError('Face bone not found')
 
         self.bone_props = get_edit_bones_props(self.ao)
-        self.face_children = list(map(lambda x: x.name, face_bone.children_recursive))
+        self.face_children = [x.name for x in face_bone.children_recursive]
 
         self.ifa = IFA(self.make_bone_list())
         write_ifa_to_file(self.ifa, self.filepath)
@@ -712,8 +725,8 @@ def split_vector(center_bone: GMTBone, vector_bone: GMTBone, vector_version: GMT
     # not is_auth -> vector should be used for X and Z of center, center should have Y only
     # Rotation should be copied to vector in all cases, and should be removed from center in all cases except (OLD_VECTOR and is_auth)
 
-    vector_bone.location = deepcopy(center_bone.location) or GMTCurve.new_location_curve()
-    vector_bone.rotation = deepcopy(center_bone.rotation) or GMTCurve.new_location_curve()
+    vector_bone.location = copy_curve(center_bone.location) or GMTCurve.new_location_curve()
+    vector_bone.rotation = copy_curve(center_bone.rotation) or GMTCurve.new_location_curve()
 
     if vector_version == GMTVectorVersion.DRAGON_VECTOR and is_auth:
         center_bone.location = GMTCurve.new_location_curve()
@@ -745,5 +758,19 @@ def split_vector(center_bone: GMTBone, vector_bone: GMTBone, vector_version: GMT
             center_bone.rotation = GMTCurve.new_rotation_curve()
 
 
+def copy_curve(curve: GMTCurve) -> GMTCurve:
+    """Copies a curve along with its keyframes, but not the keyframe values.
+    Exported values are tuples, which are only replaced and never modified in place.
+    """
+
+    if curve is None:
+        return None
+
+    new_curve = copy(curve)
+    new_curve.keyframes = [GMTKeyframe(kf.frame, kf.value) for kf in curve.keyframes]
+
+    return new_curve
+
+
 def menu_func_export(self, context):
     self.layout.operator(ExportGMT.bl_idname, text='Yakuza Animation (.gmt/.cmt/.ifa)')
@@ -1,8 +1,9 @@
 from copy import deepcopy
 from os.path import basename
-from typing import Dict
+from typing import Dict, Tuple
 
 import bpy
+import numpy as np
 from bpy.props import BoolProperty, EnumProperty, StringProperty
 from bpy.types import Action, Operator
 from bpy_extras.io_utils import ImportHelper
@@ -16,6 +17,7 @@ from .bone_props import GMTBlenderBoneProps, get_edit_bones_props
 from .coordinate_converter import (convert_cmt_anm_to_blender,
                                    convert_gmt_curve_to_blender,
                                    pattern1_to_blender, pattern2_to_blender,
+                                   quat_mul_np, slerp_np,
                                    transform_location_to_blender,
                                    transform_rotation_to_blender)
 from .error import GMTError
@@ -120,7 +122,7 @@ class ImportGMT(Operator, ImportHelper):
 
         # check the active object first
         ao = context.active_object
-        if ao and ao.type == 'ARMATURE' and ao.data.bones[:]:
+        if ao and ao.type == 'ARMATURE' and len(ao.data.bones):
             return 0
 
         # if the active object isn't a valid armature, get its collection and check
@@ -131,15 +133,17 @@ class ImportGMT(Operator, ImportHelper):
             collection = context.view_layer.active_layer_collection
 
         if collection and collection.name != 'Master Collection':
-            meshObjects = [o for o in bpy.data.collections[collection.name].objects
-                           if o.data in bpy.data.meshes[:] and o.find_armature()]
-
-            armatures = [a.find_armature() for a in meshObjects]
-            if meshObjects:
-                armature = armatures[0]
-                if armature.data.bones[:]:
-                    context.view_layer.objects.active = armature
-                    return 0
+            # Use the armature of the first mesh that has one
+            for o in bpy.data.collections[collection.name].objects:
+                if o.type != 'MESH':
+                    continue
+
+                armature = o.find_armature()
+                if armature:
+                    if len(armature.data.bones):
+                        context.view_layer.objects.active = armature
+                        return 0
+                    break
 
         return "No armature found to add animation to"
 
@@ -152,12 +156,15 @@ def setup_armature(ao: bpy.types.Object) -> Dict[str, GMTBlenderBoneProps]:
     mode = ao.mode
 
     # Necessary steps to ensure proper importing
-    ao.hide_set(False)
-    bpy.ops.object.mode_set(mode='POSE')
-    bpy.ops.pose.select_all(action='SELECT')
-    bpy.ops.pose.transforms_clear()
-    bpy.ops.pose.select_all(action='DESELECT')
+    # Clear the pose transforms directly instead of going through the pose operators
+    for pose_bone in ao.pose.bones:
+        pose_bone.location = (0.0, 0.0, 0.0)
+        pose_bone.rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+        pose_bone.rotation_euler = (0.0, 0.0, 0.0)
+        pose_bone.rotation_axis_angle = (0.0, 0.0, 1.0, 0.0)
+        pose_bone.scale = (1.0, 1.0, 1.0)
 
+    ao.hide_set(False)
     bone_props = get_edit_bones_props(ao)
 
     bpy.ops.object.mode_set(mode=mode)
@@ -248,19 +255,27 @@ class CMTImporter:
         dists, rotations = zip(*map(lambda x: x.to_dist_rotation(True), anm.frames))
 
         def import_curve(data_path, values):
-            values = enumerate(zip(*values)) if hasattr(values[0], '__iter__') else [(-1, values)]
+            values = np.array(values, dtype=np.float32)
+
+            # Interleaved (frame, value) pairs, filled with one channel at a time
+            co = np.empty(2 * len(values), dtype=np.float32)
+            co[0::2] = np.arange(len(values))
+
+            interpolation = np.full(len(values), INTERPOLATION_LINEAR, dtype=np.int32)
+
+            for i, values_channel in (enumerate(values.T) if values.ndim > 1 else [(-1, values)]):
+                co[1::2] = values_channel
 
-            for i, values_channel in values:
                 fcurve = action.fcurves.new(data_path=data_path, index=i, action_group=group.name)
                 fcurve.keyframe_points.add(len(values_channel))
-                fcurve.keyframe_points.foreach_set('co', [x for co in zip(
-                    range(len(values_channel)), values_channel) for x in co])
+                fcurve.keyframe_points.foreach_set('co', co)
+                fcurve.keyframe_points.foreach_set('interpolation', interpolation)
 
                 fcurve.update()
 
-        import_curve('location', list(map(lambda x: x.location[:], anm.frames)))
-        import_curve('rotation_quaternion', list(map(lambda x: x[:], rotations)))
-        import_curve('data.lens', list(map(lambda x: x.fov, anm.frames)))
+        import_curve('location', [x.location[:] for x in anm.frames])
+        import_curve('rotation_quaternion', [x[:] for x in rotations])
+        import_curve('data.lens', [x.fov for x in anm.frames])
 
         # Kenzan does not store the focus distance
         if self.cmt.version > CMTVersion.KENZAN:
@@ -300,6 +315,7 @@ class GMTImporter:
         bone_props = setup_armature(ao)
 
         vector_version = self.gmt.vector_version
+        pose_bones = ao.pose.bones
 
         end_frame = 1
         frame_rate = 30
@@ -315,9 +331,9 @@ class GMTImporter:
             action = ao.animation_data.action
 
             bones: Dict[str, GMTBone] = dict()
-            for bone_name in anm.bones:
-                if bone_name in ao.pose.bones:
-                    bones[bone_name] = anm.bones[bone_name]
+            for bone_name, bone in anm.bones.items():
+                if bone_name in pose_bones:
+                    bones[bone_name] = bone
                 else:
                     print(f'WARNING: Skipped bone: "{bone_name}"')
 
@@ -333,7 +349,6 @@ class GMTImporter:
 
             for bone_name in bones:
                 group = action.groups.new(bone_name)
-                print(f'Importing ActionGroup: {group.name}')
 
                 for curve in bones[bone_name].curves:
                     import_curve(self.context, curve, bone_name, action, group.name, anm_bone_props)
@@ -401,59 +416,83 @@ def add_curve(curve: GMTCurve, other: GMTCurve, expected_curve_type: GMTCurveTyp
     if curve.type == GMTCurveType.LOCATION:
         # Vector add and lerp
         def add(v1, v2): return v1 + v2
-        def lerp(v1, v2, f): return v1.lerp(v2, f)
+        def lerp(v1, v2, f): return (1.0 - f)[:, None] * v1 + f[:, None] * v2
 
         if len(curve.keyframes) == 0:
             curve.keyframes.append(GMTKeyframe(0, Vector()))
     elif curve.type == GMTCurveType.ROTATION:
         # Quaternion multiply and slerp
-        def add(v1, v2): return v1 @ v2
-        def lerp(v1, v2, f): return v1.slerp(v2, f)
+        def add(v1, v2): return quat_mul_np(v1, v2)
+        def lerp(v1, v2, f): return slerp_np(v1, v2, f)
 
         if len(curve.keyframes) == 0:
             curve.keyframes.append(GMTKeyframe(0, Quaternion()))
     else:
         raise GMTError(f'Incompatible curve type for addition: {curve.type}')
 
-    result = list()
-    curve_dict = {kf.frame: kf.value for kf in curve.keyframes}
-    curve_min = curve.keyframes[0].frame
-    curve_max = curve.keyframes[-1].frame
-
-    other_dict = {kf.frame: kf.value for kf in other.keyframes}
-    other_min = other.keyframes[0].frame
-    other_max = other.keyframes[-1].frame
-
-    # Iterate over frames from 0 to the last frame in either curve
-    for i in range(max(curve.get_end_frame(), other.get_end_frame()) + 1):
-        # Check if the current frame has a keyframe
-        v1 = curve_dict.get(i)
-        v2 = other_dict.get(i)
-
-        # Do not add/interpolate if no values are explicitly specified in this frame
-        if not (v1 is None and v2 is None):
-            if v1 is None:
-                # Get the last keyframe that is less than the current frame, or the first keyframe
-                less = next((k for k in reversed(curve_dict) if k < i), curve_min)
-
-                # Get the first keyframe that is greater than the current frame, or the last keyframe
-                more = next((k for k in curve_dict if k > i), curve_max)
-
-                # Interpolate between the two values for the current frame, or use the only value if there is only 1 keyframe
-                v1 = lerp(curve_dict[less], curve_dict[more], (i - less) /
-                          (more - less)) if less != more else curve_dict[less]
-            if v2 is None:
-                less = next((k for k in reversed(other_dict) if k < i), other_min)
-                more = next((k for k in other_dict if k > i), other_max)
-                v2 = lerp(other_dict[less], other_dict[more], (i - less) /
-                          (more - less)) if less != more else other_dict[less]
-
-            result.append(GMTKeyframe(i, add(v1, v2)))
-
-    curve.keyframes = result
+    def sample(frames, values, at):
+        less, more, f = get_interpolation_indices(frames, at)
+
+        # Only interpolate between keyframes, and use the exact values everywhere else
+        result = values[less]
+        between = f > 0.0
+        result[between] = lerp(values[less[between]], values[more[between]], f[between])
+
+        return result
+
+    curve_frames, curve_values = get_curve_arrays(curve)
+    other_frames, other_values = get_curve_arrays(other)
+
+    if np.array_equal(curve_frames, other_frames):
+        # Both curves have keyframes in the same frames, so there is nothing to interpolate
+        frames = curve_frames
+        values = add(curve_values, other_values)
+    else:
+        # Only add/interpolate in frames where at least one of the curves has a keyframe
+        frames = np.union1d(curve_frames, other_frames)
+
+        # Values before the first keyframe or after the last keyframe of a curve are the first or last values
+        values = add(sample(curve_frames, curve_values, frames), sample(other_frames, other_values, frames))
+
+    curve.keyframes = [GMTKeyframe(int(f), tuple(v)) for f, v in zip(frames.tolist(), values.tolist())]
     return curve
 
 
+def get_curve_arrays(curve: GMTCurve) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the frames of the curve's keyframes as an (N,) array, and their values as an (N, C) array.
+    Used to unpack the keyframes only once, before doing any work on them.
+    """
+
+    frames = np.array([kf.frame for kf in curve.keyframes], dtype=np.float64)
+    values = np.array([kf.value[:] for kf in curve.keyframes], dtype=np.float64).reshape(len(frames), -1)
+
+    return frames, values
+
+
+def get_interpolation_indices(frames: np.ndarray, at: np.ndarray):
+    """Returns the indices of the keyframes surrounding each frame in at, along with the interpolation factor
+    between them. frames should be sorted. Frames outside of the keyframe range use the first or last keyframe.
+    """
+
+    last = len(frames) - 1
+
+    # Index of the first keyframe that is greater than the current frame, for all frames at once
+    more = np.searchsorted(frames, at, side='right')
+    less = np.clip(more - 1, 0, last)
+    more = np.clip(more, 0, last)
+
+    span = frames[more] - frames[less]
+    has_span = span > 0.0
+    factor = np.where(has_span, (at - frames[less]) / np.where(has_span, span, 1.0), 0.0)
+
+    return less, more, factor
+
+
+# Keyframe.interpolation enum values, for setting all keyframes at once with foreach_set
+INTERPOLATION_CONSTANT = 0
+INTERPOLATION_LINEAR = 1
+
+
 def import_curve(context: bpy.context, curve: GMTCurve, bone_name: str, action: Action, group_name: str, bone_props: Dict[str, GMTBlenderBoneProps]):
     data_path = get_data_path_from_curve_type(context, curve.type, curve.channel)
 
@@ -461,57 +500,70 @@ def import_curve(context: bpy.context, curve: GMTCurve, bone_name: str, action:
         print(f'GMTWarning: Skipping type {curve.type} curve for {bone_name}...')
         return
 
-    frames, values = zip(*map(lambda kf: (kf.frame, kf.value), curve.keyframes))
+    frames, values = get_curve_arrays(curve)
 
-    need_const_interpolation = False
+    interpolation = INTERPOLATION_LINEAR
     if data_path == 'location':
         values = transform_location_to_blender(bone_props, bone_name, values)
     elif data_path == 'rotation_quaternion':
         values = transform_rotation_to_blender(bone_props, bone_name, values)
     elif 'pat1' in data_path:
-        need_const_interpolation = True
+        interpolation = INTERPOLATION_CONSTANT
         values = pattern1_to_blender(values)
     elif 'pat' in data_path:
-        need_const_interpolation = True
+        interpolation = INTERPOLATION_CONSTANT
         # pat2 and pat3 use the same format
         values = pattern2_to_blender(values)
     else:
         return
 
-    for i, values_channel in enumerate(zip(*values)):
-        fcurve = action.fcurves.new(data_path=(
-            f'pose.bones["{bone_name}"].{data_path}'), index=i, action_group=group_name)
-        fcurve.keyframe_points.add(len(frames))
-        fcurve.keyframe_points.foreach_set('co', [x for co in zip(frames, values_channel) for x in co])
+    values = np.array(values, dtype=np.float32).reshape(len(frames), -1)
+
+    # Interleaved (frame, value) pairs, filled with one channel at a time
+    co = np.empty(2 * len(frames), dtype=np.float32)
+    co[0::2] = frames
+
+    # GMT keyframes are interpolated linearly in-game, so bezier handles would only change the motion
+    interpolation = np.full(len(frames), interpolation, dtype=np.int32)
 
-        # Not needed if the change_interpolation() handler is active
-        if need_const_interpolation:
-            for kf in fcurve.keyframe_points:
-                kf.interpolation = 'CONSTANT'
+    new_fcurve = action.fcurves.new
+    bone_data_path = f'pose.bones["{bone_name}"].{data_path}'
+
+    for i, values_channel in enumerate(values.T):
+        co[1::2] = values_channel
+
+        fcurve = new_fcurve(data_path=bone_data_path, index=i, action_group=group_name)
+        fcurve.keyframe_points.add(len(frames))
+        fcurve.keyframe_points.foreach_set('co', co)
+        fcurve.keyframe_points.foreach_set('interpolation', interpolation)
 
         fcurve.update()
 
 
+# Data paths that do not depend on the context, looked up before creating any pattern properties
+CURVE_DATA_PATHS: Dict[Tuple[GMTCurveType, GMTCurveChannel], str] = {
+    **{(GMTCurveType.LOCATION, channel): 'location' for channel in GMTCurveChannel},
+    **{(GMTCurveType.ROTATION, channel): 'rotation_quaternion' for channel in GMTCurveChannel},
+    (GMTCurveType.PATTERN_HAND, GMTCurveChannel.LEFT_HAND): 'pat1_left_hand',
+    (GMTCurveType.PATTERN_HAND, GMTCurveChannel.RIGHT_HAND): 'pat1_right_hand',
+}
+
+
 def get_data_path_from_curve_type(context: bpy.context, curve_type: GMTCurveType, curve_channel: GMTCurveChannel) -> str:
-    if curve_type == GMTCurveType.LOCATION:
-        return 'location'
-    elif curve_type == GMTCurveType.ROTATION:
-        return 'rotation_quaternion'
-    elif curve_type == GMTCurveType.PATTERN_HAND:
-        if curve_channel == GMTCurveChannel.LEFT_HAND:
-            return 'pat1_left_hand'
-        elif curve_channel == GMTCurveChannel.RIGHT_HAND:
-            return 'pat1_right_hand'
+    data_path = CURVE_DATA_PATHS.get((curve_type, curve_channel))
+    if data_path is not None:
+        return data_path
+
+    if curve_type == GMTCurveType.PATTERN_HAND:
         # GMTCurveChannel.UNK_HAND is not explicitly checked for since it's unknown if it's actually related to hands
-        else:
-            channel = curve_channel.value
+        channel = curve_channel.value
 
-            pat_tuple = (-32_768, 32_767, 0, f'pat1_unk_{channel}', f'Pat1 Unk {channel}', "Unknown pattern property")
-            pat_string = '|'.join(map(lambda x: str(x), pat_tuple))
+        pat_tuple = (-32_768, 32_767, 0, f'pat1_unk_{channel}', f'Pat1 Unk {channel}', "Unknown pattern property")
+        pat_string = '|'.join(map(lambda x: str(x), pat_tuple))
 
-            # The type will be created, but it won't be added to the types dict (to be deleted) here
-            # That will be taken care of in the unregister function of the addon
-            return create_pose_bone_type(context, pat_string)
+        # The type will be created, but it won't be added to the types dict (to be deleted) here
+        # That will be taken care of in the unregister function of the addon
+        return create_pose_bone_type(context, pat_string)
     elif curve_type in (GMTCurveType.PATTERN_UNK, GMTCurveType.PATTERN_FACE):
         channel = curve_channel.value
 